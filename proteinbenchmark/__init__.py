@@ -5,7 +5,30 @@
 from ._version import get_versions
 from .proteinbenchmark import *
 
+# Names of force field dictionaries that are built on first access
+_LAZY_FORCE_FIELD_ATTRIBUTES = {
+    "force_fields",
+    "force_fields_by_ff_xml",
+    "force_fields_by_water_model",
+}
+
+# The force_fields dictionary is exposed in place of the force_fields submodule,
+# so drop the submodule binding and let __getattr__ forward it on first access
+globals().pop("force_fields", None)
+
 versions = get_versions()
 __version__ = versions["version"]
 __git_revision__ = versions["full-revisionid"]
 del get_versions, versions
+
+
+def __getattr__(name):
+    if name in _LAZY_FORCE_FIELD_ATTRIBUTES:
+        import importlib
+
+        value = getattr(importlib.import_module(".force_fields", __name__), name)
+        globals()[name] = value
+
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -82,7 +82,9 @@ def align_trajectory(
     output_trajectory = loos.DCDWriter(f"{output_prefix}.dcd")
 
     first_frame = True
-    
+
+    # Superposition, transformation, and recentering are done by the LOOS C++
+    # library, so the Python loop only dispatches one call of each per frame
     for frame in trajectory:
         # Align frame onto reference
         transform_matrix = align_atoms.superposition(reference_atoms)
@@ -110,6 +112,8 @@ def measure_dihedrals(
     trajectory_path: str,
     frame_length: unit.Quantity,
     output_path: str,
+    topology=None,
+    trajectory: Trajectory = None,
 ):
     """
     Measure the tau angle, backbone dihedrals, and sidechain dihedrals over a
@@ -125,12 +129,33 @@ def measure_dihedrals(
        The amount of simulation time between frames in the trajectory.
     output_path
         The path to write the time series of dihedrals.
+    topology
+        A LOOS system already read from topology_path. If not provided, the
+        topology is read from topology_path.
+    trajectory
+        A pyloos Trajectory over trajectory_path with topology as its model, e.g.
+        to share one open trajectory between measurements. If not provided, the
+        trajectory is opened from trajectory_path.
+
+    Returns
+    -------
+    fragment_index
+        The index of the last fragment written to f"{output_path}-{index}", or
+        0 if the time series was written to output_path in one file.
+    dihedral_df
+        The dihedrals in the last fragment written, which is the full time
+        series if fragment_index is 0.
     """
 
     import loos
 
+    if trajectory is not None and topology is None:
+        raise ValueError("A topology must be provided with trajectory.")
+
     # Load topology
-    topology = loos.createSystem(topology_path)
+    if topology is None:
+        topology = loos.createSystem(topology_path)
+
     min_resid = topology.minResid()
     max_resid = topology.maxResid()
     cterm_resname = topology[len(topology) - 1].resname()
@@ -207,12 +232,18 @@ def measure_dihedrals(
             }
         )
 
-    # Set up trajectory
-    trajectory = Trajectory(trajectory_path, topology)
+    # Set up trajectory, rewinding a trajectory shared with other measurements
+    if trajectory is None:
+        trajectory = Trajectory(trajectory_path, topology)
+    else:
+        trajectory.reset()
     frame_time = 0.0 * unit.picosecond
     fragment_index = 0
     dihedrals = list()
 
+    # Round stored dihedrals once per fragment rather than once per value
+    decimals = {"Dihedral (deg)": DIHEDRAL_DECIMALS}
+
     # Load one frame into memory at a time
     for frame in trajectory:
         frame_time += frame_length
@@ -223,7 +254,9 @@ def measure_dihedrals(
         # Write dihedrals to file every 10 000 frames to avoid pandas
         # out-of-memory
         if frame_index % 10000 == 0 and frame_index > 0:
-            list_of_dicts_to_csv(dihedrals, f"{output_path}-{fragment_index}")
+            list_of_dicts_to_csv(
+                dihedrals, f"{output_path}-{fragment_index}", decimals=decimals
+            )
             fragment_index += 1
             dihedrals = list()
 
@@ -248,12 +281,14 @@ def measure_dihedrals(
                 )
 
     if fragment_index == 0:
-        list_of_dicts_to_csv(dihedrals, output_path)
+        dihedral_df = list_of_dicts_to_csv(dihedrals, output_path, decimals=decimals)
 
     else:
-        list_of_dicts_to_csv(dihedrals, f"{output_path}-{fragment_index}")
+        dihedral_df = list_of_dicts_to_csv(
+            dihedrals, f"{output_path}-{fragment_index}", decimals=decimals
+        )
 
-    return fragment_index
+    return fragment_index, dihedral_df
 
 
 def measure_h_bond_geometries(
@@ -264,6 +299,8 @@ def measure_h_bond_geometries(
     h_bond_distance_cutoff: unit.Quantity = 2.5 * unit.angstrom,
     h_bond_angle_cutoff: float = 30,
     occupancy_threshold: float = 0.01,
+    topology=None,
+    trajectory: Trajectory = None,
 ):
     """
     Measure the donor-acceptor distance, hydrogen-acceptor distance, and donor-
@@ -289,12 +326,24 @@ def measure_h_bond_geometries(
     occupancy_threshold
         Fraction of frames in which a putative hydrogen bond must be occupied to
         be considered observed and be measured.
+    topology
+        A LOOS system already read from topology_path. If not provided, the
+        topology is read from topology_path.
+    trajectory
+        A pyloos Trajectory over trajectory_path with topology as its model, e.g.
+        to share one open trajectory between measurements. If not provided, the
+        trajectory is opened from trajectory_path.
     """
 
     import loos
 
+    if trajectory is not None and topology is None:
+        raise ValueError("A topology must be provided with trajectory.")
+
     # Load topology
-    topology = loos.createSystem(topology_path)
+    if topology is None:
+        topology = loos.createSystem(topology_path)
+
     min_resid = topology.minResid()
     max_resid = topology.maxResid()
 
@@ -383,8 +432,11 @@ def measure_h_bond_geometries(
 
             putative_h_bonds.append([donor_atom, hydrogen_atom, acceptor_atom])
 
-    # Set up trajectory
-    trajectory = Trajectory(trajectory_path, topology)
+    # Set up trajectory, rewinding a trajectory shared with other measurements
+    if trajectory is None:
+        trajectory = Trajectory(trajectory_path, topology)
+    else:
+        trajectory.reset()
 
     # Count observations of putative hydrogen bonds
     h_bond_observations = numpy.zeros(len(putative_h_bonds))
@@ -536,6 +588,7 @@ def assign_dihedral_clusters(
     output_path: str,
     ramachandran: str = "hollingsworth",
     rotamer: str = "hintze",
+    dihedral_df: pandas.DataFrame = None,
 ):
     """
     Assign frames to Ramachandran clusters based on backbone dihedrals and to
@@ -551,6 +604,9 @@ def assign_dihedral_clusters(
         The name of the definitions of Ramachandran clusters.
     rotamer
         The name of the rotamer library.
+    dihedral_df
+        The time series of dihedrals already in memory, e.g. as returned by
+        measure_dihedrals(). If provided, dihedrals_path is not read.
     """
 
     # Check Ramachandran cluster definition
@@ -567,12 +623,14 @@ def assign_dihedral_clusters(
 
     if rotamer == "hintze":
         rotamer_library = HINTZE_ROTAMER_LIBRARY
+        symmetric_dihedrals = HINTZE_SYMMETRIC_DIHEDRALS
 
     else:
         raise ValueError("Argument `rotamer` must be one of\n    hintze")
 
     # Read time series of dihedrals
-    dihedral_df = pandas.read_csv(dihedrals_path, index_col=0)
+    if dihedral_df is None:
+        dihedral_df = pandas.read_csv(dihedrals_path, index_col=0)
 
     dihedral_df = (
         dihedral_df.pivot(
@@ -588,52 +646,80 @@ def assign_dihedral_clusters(
     # Wrap phi into [0, 360) and psi into [-120, 240) so that no clusters are
     # split across a periodic boundary
     # wrapped_value = (value - lower) % (upper - lower) + lower
-    phi = dihedral_df["phi (deg)"] % 360
-    psi = (dihedral_df["psi (deg)"] + 120) % 360 - 120
-
-    # Assign residues with defined phi and psi values to the outlier cluster
-    dihedral_df["Ramachandran Cluster"] = None
-    dihedral_df.loc[~((phi.isna()) | (psi.isna())), "Ramachandran Cluster"] = "Outlier"
-
-    # Assign Ramachandran clusters
-    for cluster in ramachandran_clusters:
-        dihedral_df.loc[
-            (phi > cluster["phi"][0])
-            & (phi < cluster["phi"][1])
-            & (psi > cluster["psi"][0])
-            & (psi < cluster["psi"][1]),
-            "Ramachandran Cluster",
-        ] = cluster["cluster"]
-
-    # Get list of sidechain dihedrals in target
-    target_sidechain_dihedrals = [
-        f"chi{i}" for i in range(1, 5) if f"chi{i} (deg)" in dihedral_df.columns
+    phi = dihedral_df["phi (deg)"].to_numpy() % 360
+    psi = (dihedral_df["psi (deg)"].to_numpy() + 120) % 360 - 120
+
+    # Assign Ramachandran clusters in a single pass over all rows. Residues with
+    # defined phi and psi values that are not in any cluster are outliers.
+    # numpy.select() takes the first matching condition, so reverse the list of
+    # clusters to give later clusters precedence, e.g. alpha within delta.
+    cluster_conditions = [
+        (phi > cluster["phi"][0])
+        & (phi < cluster["phi"][1])
+        & (psi > cluster["psi"][0])
+        & (psi < cluster["psi"][1])
+        for cluster in reversed(ramachandran_clusters)
     ]
+    cluster_names = [
+        cluster["cluster"] for cluster in reversed(ramachandran_clusters)
+    ]
+
+    dihedral_df["Ramachandran Cluster"] = numpy.select(
+        [*cluster_conditions, ~(numpy.isnan(phi) | numpy.isnan(psi))],
+        [*cluster_names, "Outlier"],
+        default=None,
+    )
 
-    # Assign sidechain rotamers
-    dihedral_df["Sidechain Rotamer"] = None
+    # Assign sidechain rotamers. Only the rows for one residue type are compared
+    # to the rotamers for that residue type.
+    resnames = dihedral_df["Resname"].to_numpy()
+    sidechain_rotamers = numpy.full(len(dihedral_df), None, dtype=object)
 
     for resname in dihedral_df["Resname"].unique():
         if resname not in rotamer_library:
             continue
 
+        resname_rotamers = rotamer_library[resname]
+        resname_rows = numpy.flatnonzero(resnames == resname)
+
+        # Sidechain dihedrals that are in the rotamer library and were measured
+        # for this residue type
+        resname_chis = dict()
+
+        for chi in ["chi1", "chi2", "chi3", "chi4"]:
+            if (
+                f"{chi}_mean" in resname_rotamers.columns
+                and f"{chi} (deg)" in dihedral_df.columns
+            ):
+                chi_values = dihedral_df[f"{chi} (deg)"].to_numpy()[resname_rows]
+
+                if not numpy.isnan(chi_values).all():
+                    resname_chis[chi] = chi_values
+
         # Assign residues with non-trivial sidechains to the outlier rotamer
-        resname_rows = dihedral_df["Resname"] == resname
-        dihedral_df.loc[resname_rows, "Sidechain Rotamer"] = "Outlier"
-
-        # Assign rotamers for this residue type
-        for rotamer_index, rotamer in rotamer_library[resname].iterrows():
-            selected_rows = resname_rows
-
-            for chi in ["chi1", "chi2", "chi3", "chi4"]:
-                if f"{chi}_mean" in residue_df.columns:
-                    diff = dihedral_df[f"{chi} (deg)"] - rotamer[f"{chi}_mean"]
-                    abs_wrapped_diff = ((diff + 180) % 360 - 180).abs()
-                    selected_rows = selected_rows & (
-                        abs_wrapped_diff < rotamer[f"{chi}_esd"]
-                    )
+        assigned_rotamers = numpy.full(len(resname_rows), "Outlier", dtype=object)
+
+        # Assign rotamers for this residue type. Rotamers are sorted by
+        # increasing frequency, so more frequent rotamers take precedence.
+        for rotamer_index, rotamer in resname_rotamers.iterrows():
+            selected_rows = numpy.ones(len(resname_rows), dtype=bool)
+
+            for chi, chi_values in resname_chis.items():
+                # Symmetric terminal dihedrals have a period of 180 deg
+                if chi in symmetric_dihedrals.get(resname, set()):
+                    period = 180
+                else:
+                    period = 360
+
+                diff = chi_values - rotamer[f"{chi}_mean"]
+                abs_wrapped_diff = numpy.abs((diff + period / 2) % period - period / 2)
+                selected_rows &= abs_wrapped_diff < rotamer[f"{chi}_esd"]
+
+            assigned_rotamers[selected_rows] = rotamer["rotamer"]
+
+        sidechain_rotamers[resname_rows] = assigned_rotamers
 
-            dihedral_df.loc[selected_rows, "Sidechain Rotamer"] = rotamer["rotamer"]
+    dihedral_df["Sidechain Rotamer"] = sidechain_rotamers
 
     dihedral_df.to_csv(output_path)
 
@@ -8,6 +8,10 @@ from proteinbenchmark.utilities import package_data_directory
 
 DCD_TIME_TO_PICOSECONDS = 0.04888821 * unit.picoseconds
 
+# Number of decimal places stored for measured dihedrals. A resolution of
+# 0.01 deg is well below the widths of Ramachandran clusters and rotamers.
+DIHEDRAL_DECIMALS = 2
+
 # Lists of atoms that make up named dihedrals in protein residues
 DIHEDRAL_ATOMS = {
     resname: {
@@ -166,6 +170,18 @@ HINTZE_ROTAMER_LIBRARY["HID"] = HINTZE_ROTAMER_LIBRARY["HIE"]
 HINTZE_ROTAMER_LIBRARY["HIP"] = HINTZE_ROTAMER_LIBRARY["HIE"]
 HINTZE_ROTAMER_LIBRARY["LYN"] = HINTZE_ROTAMER_LIBRARY["LYS"]
 
+# Terminal sidechain dihedrals that are symmetric under a 180 deg rotation of
+# the terminal group. The Hintze rotamer library folds these dihedrals into a
+# half circle, so they are compared with a period of 180 deg.
+HINTZE_SYMMETRIC_DIHEDRALS = {
+    "ASP": {"chi2"},
+    "ASH": {"chi2"},
+    "GLU": {"chi3"},
+    "GLH": {"chi3"},
+    "PHE": {"chi2"},
+    "TYR": {"chi2"},
+}
+
 # Karplus parameters for backbone scalar couplings from
 # Wirmer J, Schwalbe H. (2002). J. Biomol. NMR 23, 47-55.
 WIRMER_KARPLUS_PARAMETERS = {
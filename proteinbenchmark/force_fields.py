@@ -1,135 +1,293 @@
-"""List of force fields and water models."""
+"""
+List of force fields and water models.
+
+All force field and water model files are stored as strings. Files distributed
+with this package are absolute paths into ff_directory, and other files are
+names resolved by OpenMM or the OpenFF toolkit from their installed data
+directories.
+
+force_fields and its entries are read-only mappings, so results derived from a
+force field name, e.g. by load_force_field(), can be safely cached.
+"""
+import functools
 from pathlib import Path
+from types import MappingProxyType
 
 from proteinbenchmark.utilities import package_data_directory
 
+# force_fields and its reverse indices are not listed here so that star imports
+# do not build them. The package forwards them to this module on first access.
+__all__ = [
+    "ff_directory",
+    "get_force_field",
+    "load_force_field",
+    "load_force_field_files",
+    "water_model_files",
+]
+
 ff_directory = Path(package_data_directory, "force-fields")
 
+# Sentinel for force fields that take their water model file from
+# water_model_files
+_MISSING = object()
+
+# Water model files that are not distributed with this package and are instead
+# found by the OpenFF toolkit in the installed openff-forcefields package. All
+# other SMIRNOFF water model files are resolved to paths in ff_directory.
+_openff_water_model_files = {"opc-1.0.0.offxml"}
+
 # List of force fields with force field XML file, water model, and water model
-# XML file
-force_fields = {
-    "ff14sb-opc": {
-        "force_field_file": Path(
-            ff_directory, "nerenberg_ff14sb_c0ala_c0gly_c0val.xml"
-        ),
-        "water_model": "opc",
-    },
-    "ff14sb-opc3": {
-        "force_field_file": Path(
-            ff_directory, "nerenberg_ff14sb_c0ala_c0gly_c0val.xml"
-        ),
-        "water_model": "opc3",
-    },
-    "ff14sb-tian-opc": {
-        "force_field_file": Path(ff_directory, "tian_ff14sb_c0ala.xml"),
-        "water_model": "opc",
-    },
-    "ff14sb-tian-opc3": {
-        "force_field_file": Path(ff_directory, "tian_ff14sb_c0ala.xml"),
-        "water_model": "opc3",
-    },
-    "ff14sb-tian-tip3p": {
-        "force_field_file": Path(ff_directory, "tian_ff14sb_c0ala.xml"),
-        "water_model": "tip3p",
-    },
-    "ff14sb-tian-tip3p-fb": {
-        "force_field_file": Path(ff_directory, "tian_ff14sb_c0ala.xml"),
-        "water_model": "tip3p-fb",
-    },
-    "ff14sb-tian-tip4p-fb": {
-        "force_field_file": Path(ff_directory, "tian_ff14sb_c0ala.xml"),
-        "water_model": "tip4p-fb",
-    },
-    "ff14sb-tip3p": {
-        "force_field_file": Path(
-            ff_directory, "nerenberg_ff14sb_c0ala_c0gly_c0val.xml"
-        ),
-        "water_model": "tip3p",
-    },
-    "ff14sb-tip3p-fb": {
-        "force_field_file": Path(
-            ff_directory, "nerenberg_ff14sb_c0ala_c0gly_c0val.xml"
-        ),
-        "water_model": "tip3p-fb",
-    },
-    "ff14sb-tip4p-fb": {
-        "force_field_file": Path(
-            ff_directory, "nerenberg_ff14sb_c0ala_c0gly_c0val.xml"
-        ),
-        "water_model": "tip4p-fb",
-    },
-    "null-0.0.1-tip3p": {
-        "force_field_file": Path(ff_directory, "Protein-Null-0.0.1.offxml"),
-        "water_model": "tip3p",
-        "water_model_file": None,
-    },
-    "null-0.0.2-opc": {
-        "force_field_file": Path(ff_directory, "Protein-Null-0.0.2-NH2.offxml"),
-        "water_model": "opc",
-        "water_model_file": "opc-1.0.0.offxml",
-    },
-    "null-0.0.2-opc3": {
-        "force_field_file": Path(ff_directory, "Protein-Null-0.0.2-NH2.offxml"),
-        "water_model": "opc3",
-        "water_model_file": Path(ff_directory, "opc3-1.0.0.offxml"),
-    },
-    "null-0.0.2-tip3p": {
-        "force_field_file": Path(ff_directory, "Protein-Null-0.0.2-NH2.offxml"),
-        "water_model": "tip3p",
-        "water_model_file": None,
-    },
-    "null-0.0.2-tip3p-fb": {
-        "force_field_file": Path(ff_directory, "Protein-Null-0.0.2-NH2.offxml"),
-        "water_model": "tip3p-fb",
-        "water_model_file": Path(ff_directory, "tip3p_fb-1.1.0.offxml"),
-    },
-    "null-0.0.2-tip4p-fb": {
-        "force_field_file": Path(ff_directory, "Protein-Null-0.0.2-NH2.offxml"),
-        "water_model": "tip4p-fb",
-        "water_model_file": Path(ff_directory, "tip4p_fb-1.0.0.offxml"),
-    },
-    "specific-0.0.1-tip3p": {
-        "force_field_file": Path(ff_directory, "Protein-Specific-0.0.1.offxml"),
-        "water_model": "tip3p",
-        "water_model_file": None,
-    },
-    "specific-0.0.2-opc": {
-        "force_field_file": Path(ff_directory, "Protein-Specific-0.0.2-NH2.offxml"),
-        "water_model": "opc",
-        "water_model_file": "opc-1.0.0.offxml",
-    },
-    "specific-0.0.2-opc3": {
-        "force_field_file": Path(ff_directory, "Protein-Specific-0.0.2-NH2.offxml"),
-        "water_model": "opc3",
-        "water_model_file": Path(ff_directory, "opc3-1.0.0.offxml"),
-    },
-    "specific-0.0.2-tip3p": {
-        "force_field_file": Path(ff_directory, "Protein-Specific-0.0.2-NH2.offxml"),
-        "water_model": "tip3p",
-        "water_model_file": None,
-    },
-    "specific-0.0.2-tip3p-fb": {
-        "force_field_file": Path(ff_directory, "Protein-Specific-0.0.2-NH2.offxml"),
-        "water_model": "tip3p-fb",
-        "water_model_file": Path(ff_directory, "tip3p_fb-1.1.0.offxml"),
-    },
-    "specific-0.0.2-tip4p-fb": {
-        "force_field_file": Path(ff_directory, "Protein-Specific-0.0.2-NH2.offxml"),
-        "water_model": "tip4p-fb",
-        "water_model_file": Path(ff_directory, "tip4p_fb-1.0.0.offxml"),
-    },
-}
+# XML file. The water model XML file is None if the water model is included in
+# the force field XML file, or omitted to use the file in water_model_files.
+# Entries are built on first access by get_force_field().
+_FF_SPECS = (
+    ("ff14sb-opc", "nerenberg_ff14sb_c0ala_c0gly_c0val.xml", "opc"),
+    ("ff14sb-opc3", "nerenberg_ff14sb_c0ala_c0gly_c0val.xml", "opc3"),
+    ("ff14sb-tian-opc", "tian_ff14sb_c0ala.xml", "opc"),
+    ("ff14sb-tian-opc3", "tian_ff14sb_c0ala.xml", "opc3"),
+    ("ff14sb-tian-tip3p", "tian_ff14sb_c0ala.xml", "tip3p"),
+    ("ff14sb-tian-tip3p-fb", "tian_ff14sb_c0ala.xml", "tip3p-fb"),
+    ("ff14sb-tian-tip4p-fb", "tian_ff14sb_c0ala.xml", "tip4p-fb"),
+    ("ff14sb-tip3p", "nerenberg_ff14sb_c0ala_c0gly_c0val.xml", "tip3p"),
+    ("ff14sb-tip3p-fb", "nerenberg_ff14sb_c0ala_c0gly_c0val.xml", "tip3p-fb"),
+    ("ff14sb-tip4p-fb", "nerenberg_ff14sb_c0ala_c0gly_c0val.xml", "tip4p-fb"),
+    ("null-0.0.1-tip3p", "Protein-Null-0.0.1.offxml", "tip3p", None),
+    ("null-0.0.2-opc", "Protein-Null-0.0.2-NH2.offxml", "opc", "opc-1.0.0.offxml"),
+    (
+        "null-0.0.2-opc3",
+        "Protein-Null-0.0.2-NH2.offxml",
+        "opc3",
+        "opc3-1.0.0.offxml",
+    ),
+    ("null-0.0.2-tip3p", "Protein-Null-0.0.2-NH2.offxml", "tip3p", None),
+    (
+        "null-0.0.2-tip3p-fb",
+        "Protein-Null-0.0.2-NH2.offxml",
+        "tip3p-fb",
+        "tip3p_fb-1.1.0.offxml",
+    ),
+    (
+        "null-0.0.2-tip4p-fb",
+        "Protein-Null-0.0.2-NH2.offxml",
+        "tip4p-fb",
+        "tip4p_fb-1.0.0.offxml",
+    ),
+    ("specific-0.0.1-tip3p", "Protein-Specific-0.0.1.offxml", "tip3p", None),
+    (
+        "specific-0.0.2-opc",
+        "Protein-Specific-0.0.2-NH2.offxml",
+        "opc",
+        "opc-1.0.0.offxml",
+    ),
+    (
+        "specific-0.0.2-opc3",
+        "Protein-Specific-0.0.2-NH2.offxml",
+        "opc3",
+        "opc3-1.0.0.offxml",
+    ),
+    ("specific-0.0.2-tip3p", "Protein-Specific-0.0.2-NH2.offxml", "tip3p", None),
+    (
+        "specific-0.0.2-tip3p-fb",
+        "Protein-Specific-0.0.2-NH2.offxml",
+        "tip3p-fb",
+        "tip3p_fb-1.1.0.offxml",
+    ),
+    (
+        "specific-0.0.2-tip4p-fb",
+        "Protein-Specific-0.0.2-NH2.offxml",
+        "tip4p-fb",
+        "tip4p_fb-1.0.0.offxml",
+    ),
+)
+
+_ff_specs_by_name = {spec[0]: spec[1:] for spec in _FF_SPECS}
+
+
+@functools.lru_cache(maxsize=None)
+def _ff_path(file_name: str) -> str:
+    """
+    Return the path to a file in ff_directory. Paths are cached so that entries
+    sharing a force field or water model file share a single string. This does
+    not touch the filesystem; see _check_ff_file().
+    """
+
+    return f"{ff_directory}/{file_name}"
+
+
+@functools.lru_cache(maxsize=None)
+def _check_ff_file(ff_path: str):
+    """
+    Raise a ValueError if a file in ff_directory does not exist. Each file is
+    checked only once, when a force field that uses it is first looked up.
+    """
+
+    if not Path(ff_path).is_file():
+        raise ValueError(
+            f"Force field file {Path(ff_path).name} does not exist in "
+            f"{ff_directory}. Files distributed with the openff-forcefields "
+            "package must be added to _openff_water_model_files."
+        )
+
 
 # Add implicit water model files
 water_model_files = {
     "tip3p": "amber/tip3p_standard.xml",
-    "opc3": Path(ff_directory, "openmm-opc3.xml"),
+    "opc3": _ff_path("openmm-opc3.xml"),
     "opc": "amber/opc_standard.xml",
-    "tip3p-fb": Path(ff_directory, "openmm-tip3p-fb.xml"),
-    "tip4p-fb": Path(ff_directory, "openmm-tip4p-fb.xml"),
+    "tip3p-fb": _ff_path("openmm-tip3p-fb.xml"),
+    "tip4p-fb": _ff_path("openmm-tip4p-fb.xml"),
 }
 
-for force_field_name, ff_parameters in force_fields.items():
-    if "water_model_file" not in ff_parameters:
-        water_model_file = water_model_files[ff_parameters["water_model"]]
-        ff_parameters["water_model_file"] = water_model_file
+# Water model files are either paths into ff_directory or paths relative to the
+# OpenMM data directory, never bare file names
+assert all(
+    Path(water_model_file).parent != Path(".")
+    for water_model_file in water_model_files.values()
+)
+
+
+def _entry(
+    force_field_file: str,
+    water_model: str,
+    water_model_file: str = _MISSING,
+) -> MappingProxyType:
+    """Build the read-only mapping of parameters for one force field."""
+
+    if water_model_file is _MISSING:
+        water_model_file = water_model_files[water_model]
+    elif water_model_file is not None and (
+        water_model_file not in _openff_water_model_files
+    ):
+        water_model_file = _ff_path(water_model_file)
+
+    force_field_file = _ff_path(force_field_file)
+    _check_ff_file(force_field_file)
+
+    if water_model_file is not None and Path(water_model_file).parent == ff_directory:
+        _check_ff_file(water_model_file)
+
+    return MappingProxyType(
+        {
+            "force_field_file": force_field_file,
+            "water_model": water_model,
+            "water_model_file": water_model_file,
+        }
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_force_field(force_field_name: str) -> MappingProxyType:
+    """
+    Return the force field XML file, water model, and water model XML file for
+    a single force field without building the full force_fields dictionary.
+
+    Parameters
+    ----------
+    force_field_name
+        The name of the force field, e.g. "ff14sb-tip3p".
+    """
+
+    if force_field_name not in _ff_specs_by_name:
+        raise ValueError(
+            f"Force field {force_field_name} must be one of\n    "
+            + "\n    ".join(_ff_specs_by_name)
+        )
+
+    return _entry(*_ff_specs_by_name[force_field_name])
+
+
+@functools.lru_cache(maxsize=None)
+def load_force_field(force_field_name: str):
+    """
+    Return the parsed force field and water model for a force field name, as an
+    OpenFF ForceField for SMIRNOFF force fields or an OpenMM ForceField
+    otherwise. Repeated calls return the same object, so it should not be
+    modified by the caller.
+
+    Parameters
+    ----------
+    force_field_name
+        The name of the force field, e.g. "ff14sb-tip3p".
+    """
+
+    ff_parameters = get_force_field(force_field_name)
+
+    return load_force_field_files(
+        ff_parameters["force_field_file"], ff_parameters["water_model_file"]
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_force_field_files(force_field_file: str, water_model_file: str = None):
+    """
+    Return the parsed force field and water model from their files, as an OpenFF
+    ForceField for SMIRNOFF force fields or an OpenMM ForceField otherwise.
+    Repeated calls with the same files return the same object, so it should not
+    be modified by the caller.
+
+    Parameters
+    ----------
+    force_field_file
+        The path to the force field file.
+    water_model_file
+        The path to the water model file, or None if the water model is included
+        in the force field file.
+    """
+
+    if water_model_file is None:
+        xml_files = [force_field_file]
+    else:
+        xml_files = [force_field_file, water_model_file]
+
+    if Path(force_field_file).suffix == ".offxml":
+        from openff.toolkit import ForceField as OFFForceField
+
+        return OFFForceField(*xml_files)
+
+    else:
+        from openmm import app
+
+        return app.ForceField(*xml_files)
+
+
+def __getattr__(name):
+    # Build the force_fields dictionary and its reverse indices on first access
+    # and cache them as module attributes so that later lookups bypass this
+    # function. The reverse indices map a force field XML file or a water model
+    # to the names of all force fields that use it.
+    if name in {
+        "force_fields",
+        "force_fields_by_ff_xml",
+        "force_fields_by_water_model",
+    }:
+        force_fields = dict()
+        force_fields_by_ff_xml = dict()
+        force_fields_by_water_model = dict()
+
+        for force_field_name in _ff_specs_by_name:
+            ff_parameters = get_force_field(force_field_name)
+            force_fields[force_field_name] = ff_parameters
+
+            force_fields_by_ff_xml.setdefault(
+                ff_parameters["force_field_file"], []
+            ).append(force_field_name)
+            force_fields_by_water_model.setdefault(
+                ff_parameters["water_model"], []
+            ).append(force_field_name)
+
+        globals().update(
+            force_fields=MappingProxyType(force_fields),
+            force_fields_by_ff_xml=MappingProxyType(
+                {key: tuple(value) for key, value in force_fields_by_ff_xml.items()}
+            ),
+            force_fields_by_water_model=MappingProxyType(
+                {
+                    key: tuple(value)
+                    for key, value in force_fields_by_water_model.items()
+                }
+            ),
+        )
+
+        return globals()[name]
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
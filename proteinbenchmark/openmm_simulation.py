@@ -1,11 +1,113 @@
 from pathlib import Path
+from typing import List
 
 import numpy
 import openmm
 from openmm import app, unit
 
+from proteinbenchmark.simulation_parameters import MULTI_GPU_MIN_ATOMS
 from proteinbenchmark.utilities import exists_and_not_empty, read_xml
 
+# OpenMM platforms in order of preference if no platform is specified
+# GPU platforms in order of preference when no platform is named. The CPU and
+# Reference platforms are only used when requested by name, so that a missing
+# GPU plugin does not silently slow simulations down by orders of magnitude.
+OPENMM_PLATFORMS = ["CUDA", "HIP", "OpenCL"]
+
+# Size in bytes of the file buffer for DCD trajectories
+DCD_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+class BufferedDCDReporter(app.DCDReporter):
+    """
+    A DCDReporter that writes to a file with a large buffer so that each frame
+    is written in a single system call. OpenMM flushes the file after every
+    frame, so no frames are held in memory between reports.
+    """
+
+    def __init__(
+        self,
+        file: str,
+        reportInterval: int,
+        append: bool = False,
+        buffer_size: int = DCD_BUFFER_SIZE,
+        **kwargs,
+    ):
+        super().__init__(file, reportInterval, append=append, **kwargs)
+
+        # Reopen the file opened by DCDReporter with a larger buffer
+        self._out.close()
+        self._out = open(file, "r+b" if append else "wb", buffering=buffer_size)
+
+
+def get_openmm_platform_name(platform_name: str = None) -> str:
+    """
+    Return the name of the OpenMM Platform to use. If no name is given, return
+    the first available GPU platform in OPENMM_PLATFORMS, or raise a ValueError
+    if none is available.
+
+    Parameters
+    ----------
+    platform_name
+        The name of the OpenMM Platform, e.g. "CUDA", "HIP", "OpenCL", or "CPU".
+    """
+
+    if platform_name is not None:
+        return platform_name
+
+    available_platforms = {
+        openmm.Platform.getPlatform(i).getName()
+        for i in range(openmm.Platform.getNumPlatforms())
+    }
+
+    for platform_name in OPENMM_PLATFORMS:
+        if platform_name in available_platforms:
+            return platform_name
+
+    raise ValueError(
+        "No GPU OpenMM Platform is available. Available platforms are\n    "
+        + "\n    ".join(sorted(available_platforms))
+        + '\nPass the platform name, e.g. "CPU", to run without a GPU.'
+    )
+
+
+def get_openmm_platform(
+    platform_name: str = None,
+    precision: str = None,
+    device_indices: List[int] = None,
+):
+    """
+    Get an OpenMM Platform and its properties.
+
+    Parameters
+    ----------
+    platform_name
+        The name of the OpenMM Platform, e.g. "CUDA", "HIP", or "OpenCL".
+        Default is the first available GPU platform in OPENMM_PLATFORMS.
+    precision
+        The floating point precision for platforms that support it, i.e.
+        "single", "mixed", or "double". Default is the platform default.
+    device_indices
+        Indices of the GPUs to use for platforms that support it. A single
+        simulation is split across all devices in the list. Default is the
+        platform default.
+    """
+
+    platform = openmm.Platform.getPlatformByName(
+        get_openmm_platform_name(platform_name)
+    )
+
+    platform_properties = dict()
+    if precision is not None and "Precision" in platform.getPropertyNames():
+        platform_properties["Precision"] = precision
+
+    if device_indices is not None and "DeviceIndex" in platform.getPropertyNames():
+        platform_properties["DeviceIndex"] = ",".join(
+            str(device_index) for device_index in device_indices
+        )
+
+    return platform, platform_properties
+
 
 class OpenMMSimulation:
     """A class representing a simulation in OpenMM."""
@@ -14,7 +116,7 @@ class OpenMMSimulation:
         self,
         openmm_system_file: str,
         initial_pdb_file: str,
-        dcd_reporter_file: str,
+        trajectory_reporter_file: str,
         state_reporter_file: str,
         checkpoint_file: str,
         save_state_prefix: str,
@@ -27,6 +129,10 @@ class OpenMMSimulation:
         frame_length: unit.Quantity,
         checkpoint_length: unit.Quantity,
         save_state_length: unit.Quantity,
+        platform_name: str = None,
+        platform_precision: str = "mixed",
+        device_indices: List[int] = None,
+        openmm_system: openmm.System = None,
     ):
         """
         Initializes the simulation parameters and checks units.
@@ -37,8 +143,9 @@ class OpenMMSimulation:
             The path to the parametrized OpenMM system as a serialized XML.
         initial_pdb_file
             Path to PDB file used to set initial coordinates.
-        dcd_reporter_file
-            Path to DCD file to write trajectory coordinates.
+        trajectory_reporter_file
+            Path to DCD or XTC file to write trajectory coordinates. The format
+            is determined by the file extension.
         state_reporter_file
             Path to file to write state data, e.g. energies and temperature.
         checkpoint_file
@@ -66,14 +173,32 @@ class OpenMMSimulation:
         save_state_length
             The amount of time between writing serialized simulation states to
             disk.
+        platform_name
+            The name of the OpenMM Platform, e.g. "CUDA", "HIP", or "OpenCL".
+            Default is the fastest available GPU platform. "CPU" and
+            "Reference" are only used if named explicitly.
+        platform_precision
+            The floating point precision for GPU platforms.
+        device_indices
+            Indices of the GPUs to use. Systems with at least
+            MULTI_GPU_MIN_ATOMS atoms are split across all devices, and smaller
+            systems use only the first device. Default is the platform default.
+        openmm_system
+            An OpenMM system already read from openmm_system_file. If provided,
+            openmm_system_file is not read again, so the same system can be
+            shared by several simulations.
         """
 
         self.openmm_system_file = openmm_system_file
+        self.openmm_system = openmm_system
         self.initial_pdb_file = initial_pdb_file
-        self.dcd_reporter_file = dcd_reporter_file
+        self.trajectory_reporter_file = trajectory_reporter_file
         self.state_reporter_file = state_reporter_file
         self.checkpoint_file = checkpoint_file
         self.save_state_prefix = save_state_prefix
+        self.platform_name = get_openmm_platform_name(platform_name)
+        self.platform_precision = platform_precision
+        self.device_indices = device_indices
 
         # Check units of arguments
         if not temperature.unit.is_compatible(unit.kelvin):
@@ -117,6 +242,9 @@ class OpenMMSimulation:
             f"\n    output_frequency {self.output_frequency:d} steps"
             f"\n    checkpoint_frequency {self.checkpoint_frequency:d} steps"
             f"\n    save_state_frequency {self.save_state_frequency:d} steps"
+            f"\n    platform {self.platform_name}"
+            f"\n    platform_precision {self.platform_precision}"
+            f"\n    device_indices {self.device_indices}"
         )
 
     def setup_simulation(
@@ -134,16 +262,28 @@ class OpenMMSimulation:
         """
 
         # Load OpenMM system and initial PDB
-        openmm_system = read_xml(self.openmm_system_file)
+        if self.openmm_system is None:
+            openmm_system = read_xml(self.openmm_system_file)
+        else:
+            openmm_system = self.openmm_system
+
         initial_pdb = app.PDBFile(self.initial_pdb_file)
 
-        # Set up BAOAB Langevin integrator from openmmtools with VRORV splitting
+        # Set up Langevin integrator with LFMiddle discretization
         integrator = openmm.LangevinMiddleIntegrator(
             self.temperature,
             self.langevin_friction,
             self.timestep,
         )
 
+        # Remove a Monte Carlo barostat added by a previous simulation sharing
+        # this OpenMM system
+        for force_index in reversed(range(openmm_system.getNumForces())):
+            if isinstance(
+                openmm_system.getForce(force_index), openmm.MonteCarloBarostat
+            ):
+                openmm_system.removeForce(force_index)
+
         # Set up Monte Carlo barostat
         if self.pressure.value_in_unit(unit.atmosphere) > 0:
             openmm_system.addForce(
@@ -154,13 +294,30 @@ class OpenMMSimulation:
                 )
             )
 
+        # Only split a simulation across multiple GPUs if the system is large
+        # enough to amortize communication between devices
+        device_indices = self.device_indices
+        if (
+            device_indices is not None
+            and len(device_indices) > 1
+            and openmm_system.getNumParticles() < MULTI_GPU_MIN_ATOMS
+        ):
+            device_indices = device_indices[:1]
+
         # Create simulation
+        platform, platform_properties = get_openmm_platform(
+            self.platform_name, self.platform_precision, device_indices
+        )
+        print(
+            f"Using OpenMM platform {platform.getName()} with properties "
+            f"{platform_properties}"
+        )
         simulation = app.Simulation(
             initial_pdb.topology,
             openmm_system,
             integrator,
-            openmm.Platform.getPlatformByName("CUDA"),
-            {"Precision": "mixed"},
+            platform,
+            platform_properties,
         )
 
         if return_pdb:
@@ -223,12 +380,13 @@ class OpenMMSimulation:
     def resume_from_checkpoint(self):
         """
         Resume an existing OpenMM simulation from a binary checkpoint. The state
-        data and DCD reporter files will be truncated to the expected number of
-        frames from the checkpoint.
+        data and trajectory reporter files will be truncated to the expected
+        number of frames from the checkpoint.
         """
 
         import mdtraj
         from mdtraj.formats.dcd import DCDTrajectoryFile
+        from mdtraj.formats.xtc import XTCTrajectoryFile
         from mdtraj.utils import in_units_of
 
         # Create an OpenMM simulation
@@ -259,7 +417,7 @@ class OpenMMSimulation:
         if state_reporter_frames < expected_frame_count:
             raise ValueError(
                 f"The state data reporter file has {state_reporter_frames:d} "
-                f"frames but {expected_number_of_frames:d} were expected."
+                f"frames but {expected_frame_count:d} were expected."
             )
 
         elif state_reporter_frames > expected_frame_count:
@@ -282,24 +440,52 @@ class OpenMMSimulation:
             # file
             Path(tmp_file).rename(self.state_reporter_file)
 
-        # Check number of frames in DCD reporter file
+        # Check number of frames in trajectory reporter file
         mdtraj_top = mdtraj.load_topology(self.initial_pdb_file)
-        dcd_frames = 0
-        for traj in mdtraj.iterload(self.dcd_reporter_file, top=mdtraj_top):
-            dcd_frames += len(traj)
+        trajectory_frames = 0
+        for traj in mdtraj.iterload(self.trajectory_reporter_file, top=mdtraj_top):
+            trajectory_frames += len(traj)
 
-        if dcd_frames < expected_frame_count:
+        if trajectory_frames < expected_frame_count:
             raise ValueError(
-                f"The DCD reporter file has {dcd_frames:d} frames but "
-                f"{expected_number_of_frames:d} were expected."
+                f"The trajectory reporter file has {trajectory_frames:d} frames "
+                f"but {expected_frame_count:d} were expected."
             )
 
-        elif dcd_frames > expected_frame_count:
+        elif trajectory_frames > expected_frame_count and (
+            Path(self.trajectory_reporter_file).suffix == ".xtc"
+        ):
+            # Write to a temporary file so that we don't have to read the entire
+            # XTC file into memory
+            tmp_file = f"{self.trajectory_reporter_file}.tmp"
+
+            with XTCTrajectoryFile(tmp_file, "w") as output_xtc:
+                # Write frames up to the expected number from the checkpoint
+                frames_remaining = expected_frame_count
+                for traj in mdtraj.iterload(
+                    self.trajectory_reporter_file, top=mdtraj_top
+                ):
+                    traj = traj[:frames_remaining]
+                    output_xtc.write(
+                        xyz=traj.xyz,
+                        time=traj.time,
+                        box=traj.unitcell_vectors,
+                    )
+
+                    frames_remaining -= len(traj)
+                    if frames_remaining == 0:
+                        break
+
+            # Overwrite the trajectory reporter file with the truncated
+            # temporary file
+            Path(tmp_file).rename(self.trajectory_reporter_file)
+
+        elif trajectory_frames > expected_frame_count:
             # Write to a temporary file so that we don't have to read the entire
             # DCD file into memory
-            tmp_file = f"{self.dcd_reporter_file}.tmp"
+            tmp_file = f"{self.trajectory_reporter_file}.tmp"
 
-            with DCDTrajectoryFile(self.dcd_reporter_file, "r") as input_dcd:
+            with DCDTrajectoryFile(self.trajectory_reporter_file, "r") as input_dcd:
                 with DCDTrajectoryFile(tmp_file, "w") as output_dcd:
                     # Write frames up to the expected number from the checkpoint
                     frame_index = 0
@@ -321,9 +507,9 @@ class OpenMMSimulation:
                             cell_angles=frame.unitcell_angles[0],
                         )
 
-            # Overwrite the state reporter file with the truncated temporary
-            # file
-            Path(tmp_file).rename(self.dcd_reporter_file)
+            # Overwrite the trajectory reporter file with the truncated
+            # temporary file
+            Path(tmp_file).rename(self.trajectory_reporter_file)
 
         # Resume dynamics with the checkpointed simulation
         self.run_dynamics(simulation, append=True)
@@ -341,14 +527,36 @@ class OpenMMSimulation:
         simulation
             An OpenMM Simulation object.
         append
-            Append to DCD and state data reporters instead of overwriting them.
+            Append to trajectory and state data reporters instead of
+            overwriting them.
         """
 
-        # Set up reporters for DCD trajectory coordinates, state data, and
-        # binary checkpoints
-        dcd_reporter = app.DCDReporter(
-            self.dcd_reporter_file, self.output_frequency, append=append
-        )
+        # Set up reporters for trajectory coordinates, state data, and binary
+        # checkpoints
+        if Path(self.trajectory_reporter_file).suffix == ".xtc":
+            # XTCReporter was added in OpenMM 8.2 and mdtraj 1.10
+            if hasattr(app, "XTCReporter"):
+                XTCReporter = app.XTCReporter
+
+            else:
+                try:
+                    from mdtraj.reporters import XTCReporter
+
+                except ImportError:
+                    raise ValueError(
+                        "Writing XTC trajectories requires OpenMM 8.2 or mdtraj "
+                        "1.10. Use a DCD trajectory file with older versions."
+                    )
+
+            trajectory_reporter = XTCReporter(
+                self.trajectory_reporter_file, self.output_frequency, append=append
+            )
+
+        else:
+            trajectory_reporter = BufferedDCDReporter(
+                self.trajectory_reporter_file, self.output_frequency, append=append
+            )
+
         state_reporter = app.StateDataReporter(
             self.state_reporter_file,
             self.output_frequency,
@@ -367,7 +575,9 @@ class OpenMMSimulation:
             self.checkpoint_file, self.checkpoint_frequency
         )
 
-        simulation.reporters.extend([dcd_reporter, state_reporter, checkpoint_reporter])
+        simulation.reporters.extend(
+            [trajectory_reporter, state_reporter, checkpoint_reporter]
+        )
 
         # Get current index of serialized simulation state files
         save_state_index = 0
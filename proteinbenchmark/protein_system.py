@@ -1,22 +1,62 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import List
 
 import numpy
 import openmm
 from openmm import app, unit
 
-from proteinbenchmark.analysis import (align_trajectory,
-                                       assign_dihedral_clusters,
-                                       compute_fraction_helix,
-                                       compute_h_bond_scalar_couplings,
-                                       compute_scalar_couplings,
-                                       measure_dihedrals,
-                                       measure_h_bond_geometries)
+from proteinbenchmark.force_fields import load_force_field_files
 from proteinbenchmark.openmm_simulation import OpenMMSimulation
-from proteinbenchmark.gmx_simulation import GMXSimulation
 from proteinbenchmark.simulation_parameters import *
 from proteinbenchmark.system_setup import (build_initial_coordinates, minimize,
                                            solvate)
-from proteinbenchmark.utilities import exists_and_not_empty, merge_csvs
+from proteinbenchmark.utilities import (exists_and_not_empty, merge_csvs,
+                                        read_xml)
+
+logger = logging.getLogger(__name__)
+
+# Target parameters that determine the initial and protonated coordinates
+_SHARED_SETUP_PARAMETERS = (
+    "ph",
+    "initial_pdb",
+    "aa_sequence",
+    "build_method",
+    "nterm_cap",
+    "cterm_cap",
+)
+
+
+def _shared_setup_key(target_parameters: dict) -> str:
+    """
+    Return a short hash of the target parameters that determine the initial and
+    protonated coordinates.
+    """
+
+    key = repr(
+        [(name, str(target_parameters.get(name))) for name in _SHARED_SETUP_PARAMETERS]
+    )
+
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def _set_visible_device(device_index: int):
+    """Restrict CUDA and HIP in this process to a single GPU."""
+
+    os.environ["CUDA_VISIBLE_DEVICES"] = str(device_index)
+    os.environ["HIP_VISIBLE_DEVICES"] = str(device_index)
+
+
+def _set_visible_device_from_queue(device_queue):
+    """Restrict a worker process to a GPU taken from a queue of device indices."""
+
+    _set_visible_device(device_queue.get())
 
 
 class ProteinBenchmarkSystem:
@@ -36,6 +76,7 @@ class ProteinBenchmarkSystem:
         water_model_file: str = None,
         sim_platform: str = 'open_mm',
         gmx_executable: str = None,
+        openmm_platform: str = None,
     ):
         """
         Initializes the ProteinBenchmarkSystem object with target parameters.
@@ -60,6 +101,12 @@ class ProteinBenchmarkSystem:
             The name of the file containing the water model parameters.
         sim_platform
             Simulation platform from which to run energy minimization, equilibration, and production simulations
+        gmx_executable
+            The path to the GROMACS executable.
+        openmm_platform
+            The name of the OpenMM Platform, e.g. "CUDA", "HIP", or "OpenCL".
+            Default is the fastest available GPU platform. "CPU" and
+            "Reference" are only used if named explicitly.
         """
 
         self.target_name = target_name
@@ -70,6 +117,7 @@ class ProteinBenchmarkSystem:
         self.water_model_file = water_model_file
         self.sim_platform = sim_platform
         self.gmx_executable = gmx_executable
+        self.openmm_platform = openmm_platform
 
         # Check thermodynamic state
         for quantity in ["pressure", "temperature", "ph", "ionic_strength"]:
@@ -79,6 +127,20 @@ class ProteinBenchmarkSystem:
                     f'"{quantity}"'
                 )
 
+        # Check trajectory format
+        if "trajectory_format" in self.target_parameters:
+            trajectory_format = self.target_parameters["trajectory_format"].lower()
+        else:
+            trajectory_format = TRAJECTORY_FORMAT
+
+        if trajectory_format not in {"dcd", "xtc"}:
+            raise ValueError(
+                f"trajectory_format for target {target_name} must be one of\n"
+                "    dcd\n    xtc"
+            )
+
+        self.trajectory_format = trajectory_format
+
         self.system_name = f"{target_name}-{force_field_name}"
 
         # Create a directory to store results for this benchmark system
@@ -87,10 +149,69 @@ class ProteinBenchmarkSystem:
         # File paths for setup
         self.setup_dir = Path(self.base_path, "setup")
         self.setup_prefix = Path(self.setup_dir, self.system_name)
-        self.initial_pdb = f"{self.setup_prefix}-initial.pdb"
-        self.protonated_pdb = f"{self.setup_prefix}-protonated.pdb"
+
+        # Initial and protonated coordinates do not depend on the force field,
+        # so they are shared by all systems for this target with the same
+        # protonation and build parameters. Systems that were set up before the
+        # coordinates were shared keep using their own copies.
+        if exists_and_not_empty(f"{self.setup_prefix}-protonated.pdb"):
+            self.shared_setup_dir = self.setup_dir
+            shared_setup_prefix = self.setup_prefix
+
+        else:
+            self.shared_setup_dir = Path(
+                result_directory,
+                target_name,
+                f"setup-shared-{_shared_setup_key(target_parameters)}",
+            )
+            shared_setup_prefix = Path(self.shared_setup_dir, target_name)
+
+        self.initial_pdb = f"{shared_setup_prefix}-initial.pdb"
+        self.protonated_pdb = f"{shared_setup_prefix}-protonated.pdb"
+
         self.minimized_pdb = f"{self.setup_prefix}-minimized.pdb"
         self.openmm_system = f"{self.setup_prefix}-openmm-system.xml"
+        self._gmx_top = f"{self.setup_prefix}.top"
+        self._gmx_confout = f"{self.setup_dir}/confout.gro"
+
+        # Templates for replica and analysis file paths, formatted with the
+        # replica index
+        self._replica_dir_fmt = f"{self.base_path}/replica-{{replica:d}}"
+        self._replica_prefix_fmt = f"{self._replica_dir_fmt}/{self.system_name}"
+        self.analysis_dir = Path(self.base_path, "analysis")
+        self._analysis_prefix_fmt = (
+            f"{self.analysis_dir}/{self.system_name}-{{replica:d}}"
+        )
+
+        # Names of files in each directory checked for output files
+        self._dir_cache = dict()
+
+    def _exists_and_not_empty(self, file_name) -> bool:
+        """
+        Returns True if file_name exists and is not empty. The names of files in
+        each directory are listed once with os.scandir() and cached, so that
+        output files that have not been written yet are not stat'ed. Only files
+        in the listing are stat'ed to check that they are not empty. The cache
+        is cleared at the start of setup(), run_simulations(), and
+        analyze_observables(), so files written by other processes during one of
+        these calls may not be seen until the next call.
+        """
+
+        path = Path(file_name)
+        directory = path.parent
+
+        if directory not in self._dir_cache:
+            if not directory.is_dir():
+                return False
+
+            with os.scandir(directory) as dir_entries:
+                self._dir_cache[directory] = {
+                    dir_entry.name for dir_entry in dir_entries
+                }
+
+        return path.name in self._dir_cache[directory] and exists_and_not_empty(
+            path
+        )
 
     def setup(self):
         """
@@ -98,63 +219,88 @@ class ProteinBenchmarkSystem:
         deterministic and needs to be run once for all replicas.
         """
 
-        # Create the setup directory if it doesn't already exist
+        self._dir_cache.clear()
+
+        # Create the setup directories if they don't already exist
+        self.shared_setup_dir.mkdir(parents=True, exist_ok=True)
         self.setup_dir.mkdir(parents=True, exist_ok=True)
 
         solvated_pdb = f"{self.setup_prefix}-solvated.pdb"
 
-        # Build initial coordinates
-        if not exists_and_not_empty(self.protonated_pdb):
-            print(f"Building initial coordinates for system {self.system_name}")
-
-            if "initial_pdb" in self.target_parameters:
-                # Copy initial PDB to results directory
-                Path(self.initial_pdb).write_text(
-                    self.target_parameters["initial_pdb"].read_text()
-                )
-
-                build_initial_coordinates(
-                    build_method="pdb",
-                    ph=self.target_parameters["ph"],
-                    initial_pdb=self.initial_pdb,
-                    protonated_pdb=self.protonated_pdb,
-                )
+        # Build initial coordinates, unless they were already built for this
+        # target with another force field
+        if not self._exists_and_not_empty(self.protonated_pdb):
+            logger.info("Building initial coordinates for system %s", self.system_name)
+
+            # Systems for other force fields may be building the same shared
+            # coordinates concurrently, so build them in a private scratch
+            # directory and then move them into place
+            scratch_dir = tempfile.mkdtemp(dir=self.shared_setup_dir)
+            scratch_prefix = Path(scratch_dir, self.target_name)
+            initial_pdb = f"{scratch_prefix}-initial.pdb"
+            protonated_pdb = f"{scratch_prefix}-protonated.pdb"
+
+            try:
+                if "initial_pdb" in self.target_parameters:
+                    # Copy initial PDB as raw bytes
+                    Path(initial_pdb).write_bytes(
+                        Path(self.target_parameters["initial_pdb"]).read_bytes()
+                    )
+
+                    build_initial_coordinates(
+                        build_method="pdb",
+                        ph=self.target_parameters["ph"],
+                        initial_pdb=initial_pdb,
+                        protonated_pdb=protonated_pdb,
+                    )
+
+                elif "aa_sequence" in self.target_parameters:
+                    if "build_method" in self.target_parameters:
+                        build_method = self.target_parameters["build_method"]
+                    else:
+                        build_method = "extended"
+
+                    if "nterm_cap" in self.target_parameters:
+                        nterm_cap = self.target_parameters["nterm_cap"]
+                    else:
+                        nterm_cap = None
+
+                    if "cterm_cap" in self.target_parameters:
+                        cterm_cap = self.target_parameters["cterm_cap"]
+                    else:
+                        cterm_cap = None
+
+                    build_initial_coordinates(
+                        build_method=build_method,
+                        ph=self.target_parameters["ph"],
+                        initial_pdb=initial_pdb,
+                        protonated_pdb=protonated_pdb,
+                        aa_sequence=self.target_parameters["aa_sequence"],
+                        nterm_cap=nterm_cap,
+                        cterm_cap=cterm_cap,
+                    )
 
-            elif "aa_sequence" in self.target_parameters:
-                if "build_method" in self.target_parameters:
-                    build_method = self.target_parameters["build_method"]
                 else:
-                    build_method = "extended"
-
-                if "nterm_cap" in self.target_parameters:
-                    nterm_cap = self.target_parameters["nterm_cap"]
-                else:
-                    nterm_cap = None
-
-                if "cterm_cap" in self.target_parameters:
-                    cterm_cap = self.target_parameters["cterm_cap"]
-                else:
-                    cterm_cap = None
-
-                build_initial_coordinates(
-                    build_method=build_method,
-                    ph=self.target_parameters["ph"],
-                    initial_pdb=self.initial_pdb,
-                    protonated_pdb=self.protonated_pdb,
-                    aa_sequence=self.target_parameters["aa_sequence"],
-                    nterm_cap=nterm_cap,
-                    cterm_cap=cterm_cap,
+                    raise ValueError(
+                        f"benchmark_targets for target {self.target_name} must "
+                        'contain one of "aa_sequence" or "initial_pdb"'
+                    )
+
+                # Rename is atomic within a file system, so other systems never
+                # see partially written coordinates. Move the protonated PDB
+                # last, since its existence marks the coordinates as complete.
+                os.replace(initial_pdb, self.initial_pdb)
+                os.replace(
+                    f"{protonated_pdb[:-4]}.pqr", f"{self.protonated_pdb[:-4]}.pqr"
                 )
+                os.replace(protonated_pdb, self.protonated_pdb)
 
-            else:
-                raise ValueError(
-                    f"benchmark_targets for target {self.target_name} must "
-                    'contain one of "aa_sequence" or "initial_pdb"'
-                )
+            finally:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
 
         # Solvate, add ions, and construct OpenMM system
-        if (self.sim_platform != 'gmx' and not exists_and_not_empty(self.openmm_system)) or (self.sim_platform == 'gmx' and not exists_and_not_empty(f'{self.setup_prefix}.top')):
-            print(f"Solvating system {self.system_name}")
+        if (self.sim_platform != 'gmx' and not self._exists_and_not_empty(self.openmm_system)) or (self.sim_platform == 'gmx' and not self._exists_and_not_empty(self._gmx_top)):
+            logger.info("Solvating system %s", self.system_name)
 
             # Get parameters for solvation and constructing OpenMM system
             if "solvent_padding" in self.target_parameters:
@@ -174,6 +320,20 @@ class ProteinBenchmarkSystem:
             else:
                 vdw_switch_width = VDW_SWITCH_WIDTH
 
+            if "hydrogen_mass" in self.target_parameters:
+                hydrogen_mass = self.target_parameters["hydrogen_mass"]
+            else:
+                hydrogen_mass = HYDROGEN_MASS
+
+            # Reuse a parsed OpenMM force field across systems. SMIRNOFF force
+            # fields are read in solvate() together with the solute molecules.
+            if Path(self.force_field_file).suffix != ".offxml":
+                force_field = load_force_field_files(
+                    self.force_field_file, self.water_model_file
+                )
+            else:
+                force_field = None
+
             solvate(
                 ionic_strength=self.target_parameters["ionic_strength"],
                 nonbonded_cutoff=nonbonded_cutoff,
@@ -184,6 +344,8 @@ class ProteinBenchmarkSystem:
                 water_model=self.water_model,
                 force_field_file=self.force_field_file,
                 water_model_file=self.water_model_file,
+                force_field=force_field,
+                hydrogen_mass=hydrogen_mass,
                 solvent_padding=solvent_padding,
                 setup_prefix = self.setup_prefix,
                 sim_platform = self.sim_platform,
@@ -191,8 +353,8 @@ class ProteinBenchmarkSystem:
 
         # Minimize energy of solvated system with Cartesian restraints on
         # non-hydrogen solute atoms
-        if self.sim_platform != 'gmx' and not exists_and_not_empty(self.minimized_pdb):
-            print(f"Minimizing energy for system {self.system_name}")
+        if self.sim_platform != 'gmx' and not self._exists_and_not_empty(self.minimized_pdb):
+            logger.info("Minimizing energy for system %s", self.system_name)
 
             if "restraint_energy_constant" in self.target_parameters:
                 restraint_energy_constant = self.target_parameters[
@@ -209,9 +371,10 @@ class ProteinBenchmarkSystem:
                 minimized_pdb_file=self.minimized_pdb,
                 setup_prefix = self.setup_prefix,
                 sim_platform = self.sim_platform,
+                openmm_platform=self.openmm_platform,
             )
-        elif self.sim_platform == 'gmx' and not exists_and_not_empty(f'{self.setup_dir}/confout.gro'):
-            print(f"Minimizing energy for system {self.system_name}")
+        elif self.sim_platform == 'gmx' and not self._exists_and_not_empty(self._gmx_confout):
+            logger.info("Minimizing energy for system %s", self.system_name)
 
             if "energy_tolerance" in self.target_parameters:
                 energy_tolerance = self.target_parameters[
@@ -230,18 +393,33 @@ class ProteinBenchmarkSystem:
                 sim_platform = self.sim_platform,
                 gmx_executable = self.gmx_executable
             )
-        print(f"Setup complete for system {self.system_name}")
+        logger.info("Setup complete for system %s", self.system_name)
+
+    def run_simulations(self, replica: int = 1, device_indices: List[int] = None):
+        """
+        Equilibrate and run production trajectories for one replica.
+
+        Parameters
+        ----------
+        replica
+            The index of the replica.
+        device_indices
+            Indices of the GPUs used by OpenMM for this replica. Large systems
+            are split across all devices in the list.
+        """
+
+        self._dir_cache.clear()
 
-    def run_simulations(self, replica: int = 1):
-        """Equilibrate and run production trajectories for one replica."""
+        # GMXSimulation is only referenced for GROMACS runs. This does not avoid
+        # importing gmx_simulation, which the package __init__ already imports.
+        if self.sim_platform == 'gmx':
+            from proteinbenchmark.gmx_simulation import GMXSimulation
 
         # Create a directory for this replica if it doesn't already exist
-        replica_dir = Path(self.base_path, f"replica-{replica:d}")
+        replica_dir = Path(self._replica_dir_fmt.format(replica=replica))
         replica_dir.mkdir(parents=True, exist_ok=True)
 
-        replica_prefix = Path(replica_dir, self.system_name)
-        setup_dir = Path(self.base_path, "setup")
-        setup_prefix = Path(setup_dir, self.system_name)
+        replica_prefix = self._replica_prefix_fmt.format(replica=replica)
         
         equil_prefix = f"{replica_prefix}-equilibration"
         prod_prefix = f"{replica_prefix}-production"
@@ -251,12 +429,15 @@ class ProteinBenchmarkSystem:
             equilibrated_state = f"{equil_prefix}-1.xml"
         else:
             equilibrated_state = f"{equil_prefix}.gro"
-        print(equilibrated_state)
-        print(exists_and_not_empty(equilibrated_state))
+
+        # Read the OpenMM system once and share it between the equilibration and
+        # production simulations
+        if self.sim_platform != 'gmx':
+            openmm_system = read_xml(self.openmm_system)
 
         # Equilibrate at constant pressure and temperature
-        if (not exists_and_not_empty(equilibrated_state)):
-            print(f"Running NPT equilibration for system {self.system_name}")
+        if (not self._exists_and_not_empty(equilibrated_state)):
+            logger.info("Running NPT equilibration for system %s", self.system_name)
 
             # Get parameters for equilibration simulation
             if "equil_timestep" in self.target_parameters:
@@ -293,14 +474,14 @@ class ProteinBenchmarkSystem:
                     equil_barostat_frequency = EQUIL_BAROSTAT_FREQUENCY
 
                 # Initialize the equilibration simulation
-                equilibration_dcd = f"{equil_prefix}.dcd"
+                equilibration_trajectory = f"{equil_prefix}.{self.trajectory_format}"
                 equilibration_state_data = f"{equil_prefix}.out"
                 equilibration_checkpoint = f"{equil_prefix}.chk"
 
                 equilibration_simulation = OpenMMSimulation(
                     openmm_system_file=self.openmm_system,
                     initial_pdb_file=self.minimized_pdb,
-                    dcd_reporter_file=equilibration_dcd,
+                    trajectory_reporter_file=equilibration_trajectory,
                     state_reporter_file=equilibration_state_data,
                     checkpoint_file=equilibration_checkpoint,
                     save_state_prefix=equil_prefix,
@@ -313,6 +494,9 @@ class ProteinBenchmarkSystem:
                     frame_length=equil_frame_length,
                     checkpoint_length=equil_traj_length,
                     save_state_length=equil_traj_length,
+                    platform_name=self.openmm_platform,
+                    device_indices=device_indices,
+                    openmm_system=openmm_system,
                 )
 
                 # Run equilibration
@@ -337,7 +521,7 @@ class ProteinBenchmarkSystem:
                     gmx_executable = self.gmx_executable,
                     initial_pdb_file=self.minimized_pdb,
                     save_state_prefix=equil_prefix,
-                    setup_prefix=setup_prefix,
+                    setup_prefix=self.setup_prefix,
                     temperature=self.target_parameters["temperature"],
                     pressure=self.target_parameters["pressure"],
                     barostat_constant=equil_barostat_constant,
@@ -350,7 +534,7 @@ class ProteinBenchmarkSystem:
 
                 NPT_simulation.run()
 
-        print(f"Running NPT production for system {self.system_name}")
+        logger.info("Running NPT production for system %s", self.system_name)
 
         # Get parameters for production simulation
         if "timestep" in self.target_parameters:
@@ -395,20 +579,22 @@ class ProteinBenchmarkSystem:
             else:
                 checkpoint_length = CHECKPOINT_LENGTH
 
+            # By default, write a single serialized state at the end of the
+            # trajectory and rely on binary checkpoints to resume
             if "save_state_length" in self.target_parameters:
                 save_state_length = self.target_parameters["save_state_length"]
             else:
-                save_state_length = SAVE_STATE_LENGTH
+                save_state_length = traj_length
             
             # Initialize the production simulation
-            production_dcd = f"{prod_prefix}.dcd"
+            production_trajectory = f"{prod_prefix}.{self.trajectory_format}"
             production_state_data = f"{prod_prefix}.out"
             production_checkpoint = f"{prod_prefix}.chk"
 
             production_simulation = OpenMMSimulation(
                 openmm_system_file=self.openmm_system,
                 initial_pdb_file=self.minimized_pdb,
-                dcd_reporter_file=production_dcd,
+                trajectory_reporter_file=production_trajectory,
                 state_reporter_file=production_state_data,
                 checkpoint_file=production_checkpoint,
                 save_state_prefix=prod_prefix,
@@ -421,10 +607,13 @@ class ProteinBenchmarkSystem:
                 frame_length=frame_length,
                 checkpoint_length=checkpoint_length,
                 save_state_length=save_state_length,
+                platform_name=self.openmm_platform,
+                device_indices=device_indices,
+                openmm_system=openmm_system,
             )
             
             # Run production
-            if not exists_and_not_empty(production_checkpoint):
+            if not self._exists_and_not_empty(production_checkpoint):
                 # Start production simulation, initializing positions and velocities
                 # to the final state from the equilibration simulation
                 production_simulation.start_from_save_state(equilibrated_state)
@@ -455,7 +644,7 @@ class ProteinBenchmarkSystem:
             production_simulation = GMXSimulation(
                     gmx_executable = self.gmx_executable,
                     initial_pdb_file=self.minimized_pdb,
-                    setup_prefix=setup_prefix,
+                    setup_prefix=self.setup_prefix,
                     save_state_prefix=prod_prefix,
                     temperature=self.target_parameters["temperature"],
                     pressure=self.target_parameters["pressure"],
@@ -469,20 +658,146 @@ class ProteinBenchmarkSystem:
                 )
             
             #Run Production
-            if not exists_and_not_empty(production_checkpoint):
+            if not self._exists_and_not_empty(production_checkpoint):
                 # Start production simulation, initializing positions and velocities
                 # to the final state from the equilibration simulation
                 production_simulation.run()
             else:
                 production_simulation.start_from_save_state(production_checkpoint) 
 
+    def run_replicas(self, n_replicas: int, n_gpus: int = 1, analyze: bool = False):
+        """
+        Set up the system once and then equilibrate and run production
+        trajectories for independent replicas in parallel with one GPU per
+        process. If launched with more than one MPI rank, replicas are
+        distributed across ranks. Otherwise, replicas are distributed across
+        n_gpus worker processes.
+
+        Parameters
+        ----------
+        n_replicas
+            The number of replicas to run, numbered from 1 to n_replicas.
+        n_gpus
+            The number of GPUs available on each node.
+        analyze
+            Analyze each replica in a separate CPU process as soon as its
+            production trajectory is finished, while remaining replicas are
+            still running.
+        """
+
+        mp_context = multiprocessing.get_context("spawn")
+
+        if analyze:
+            analysis_executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=mp_context
+            )
+        else:
+            analysis_executor = None
+
+        analysis_futures = list()
+
+        # Shut down the analysis worker even if a replica fails
+        try:
+            try:
+                from mpi4py import MPI
+
+                comm = MPI.COMM_WORLD if MPI.COMM_WORLD.Get_size() > 1 else None
+
+            except ImportError:
+                comm = None
+
+            if comm is not None:
+                rank = comm.Get_rank()
+
+                # Select a GPU before any simulation context is created on this
+                # rank, using the rank among processes on the same node
+                node_rank = comm.Split_type(MPI.COMM_TYPE_SHARED).Get_rank()
+                _set_visible_device(node_rank % n_gpus)
+
+                # Set up the shared system on the first rank only, and tell the other
+                # ranks whether setup succeeded so that they do not wait forever
+                if rank == 0:
+                    try:
+                        self.setup()
+
+                    except Exception as error:
+                        comm.bcast(repr(error), root=0)
+                        raise
+
+                setup_error = comm.bcast(None, root=0)
+
+                if setup_error is not None:
+                    raise RuntimeError(
+                        f"Setup failed on rank 0 for system {self.system_name}: "
+                        f"{setup_error}"
+                    )
+
+                for replica in range(rank + 1, n_replicas + 1, comm.Get_size()):
+                    self.run_simulations(replica=replica)
+
+                    if analyze:
+                        analysis_futures.append(
+                            analysis_executor.submit(
+                                self.analyze_observables, replica=replica
+                            )
+                        )
+
+            else:
+                self.setup()
+
+                # Use spawned worker processes so that each one can select its GPU
+                # before initializing CUDA or HIP
+                device_queue = mp_context.Queue()
+                for device_index in range(n_gpus):
+                    device_queue.put(device_index)
+
+                with ProcessPoolExecutor(
+                    max_workers=n_gpus,
+                    mp_context=mp_context,
+                    initializer=_set_visible_device_from_queue,
+                    initargs=(device_queue,),
+                ) as executor:
+                    futures = {
+                        executor.submit(self.run_simulations, replica=replica): replica
+                        for replica in range(1, n_replicas + 1)
+                    }
+
+                    for future in as_completed(futures):
+                        future.result()
+
+                        if analyze:
+                            analysis_futures.append(
+                                analysis_executor.submit(
+                                    self.analyze_observables, replica=futures[future]
+                                )
+                            )
+
+            for future in analysis_futures:
+                future.result()
+
+        finally:
+            if analysis_executor is not None:
+                analysis_executor.shutdown()
+
     def analyze_observables(self, replica: int = 1):
         """Process trajectories and estimate observables."""
 
-        analysis_dir = Path(self.base_path, "analysis")
-        analysis_dir.mkdir(parents=True, exist_ok=True)
+        self._dir_cache.clear()
+
+        # Analysis functions are only referenced here. This does not avoid
+        # importing LOOS, the OpenFF toolkit, or pandas, since the package
+        # __init__ already imports the analysis module.
+        from proteinbenchmark.analysis import (align_trajectory,
+                                               assign_dihedral_clusters,
+                                               compute_fraction_helix,
+                                               compute_h_bond_scalar_couplings,
+                                               compute_scalar_couplings,
+                                               measure_dihedrals,
+                                               measure_h_bond_geometries)
+
+        self.analysis_dir.mkdir(parents=True, exist_ok=True)
 
-        analysis_prefix = Path(analysis_dir, f"{self.system_name}-{replica}")
+        analysis_prefix = self._analysis_prefix_fmt.format(replica=replica)
 
         reimaged_topology = f"{analysis_prefix}-reimaged.pdb"
         reimaged_trajectory = f"{analysis_prefix}-reimaged.dcd"
@@ -493,14 +808,16 @@ class ProteinBenchmarkSystem:
             frame_length = FRAME_LENGTH
 
         # Align production trajectory
-        if not exists_and_not_empty(reimaged_topology):
-            print(f"Aligning production trajectory for system {self.system_name}")
+        if not self._exists_and_not_empty(reimaged_topology):
+            logger.info(
+                "Aligning production trajectory for system %s", self.system_name
+            )
 
-            replica_dir = Path(self.base_path, f"replica-{replica:d}")
-            replica_prefix = Path(replica_dir, self.system_name)
+            replica_dir = self._replica_dir_fmt.format(replica=replica)
+            replica_prefix = self._replica_prefix_fmt.format(replica=replica)
             
             if self.sim_platform != 'gmx':
-                traj_path = f"{replica_prefix}-production.dcd"
+                traj_path = f"{replica_prefix}-production.{self.trajectory_format}"
                 output_selection = 'chainid == "A"' 
                 topology_path = self.minimized_pdb
             else:
@@ -517,13 +834,18 @@ class ProteinBenchmarkSystem:
                 reference_path=self.initial_pdb,
             )
 
-        # Measure dihedrals
         dihedrals = f"{analysis_prefix}-dihedrals.dat"
+        h_bond_geometries = f"{analysis_prefix}-hydrogen-bond-geometries.dat"
+
+        # Measure dihedrals, keeping them in memory for cluster assignment
+        dihedral_df = None
 
-        if not exists_and_not_empty(dihedrals):
-            print(f"Measuring dihedrals for system {self.system_name}")
+        if not self._exists_and_not_empty(dihedrals):
+            logger.info("Measuring dihedrals for system %s", self.system_name)
 
-            fragment_index = measure_dihedrals(
+            # Residue numbers and names in the output come from the reimaged
+            # topology, so it must not be swapped for the protonated PDB
+            fragment_index, dihedral_df = measure_dihedrals(
                 topology_path=reimaged_topology,
                 trajectory_path=reimaged_trajectory,
                 frame_length=frame_length,
@@ -531,14 +853,12 @@ class ProteinBenchmarkSystem:
             )
 
             if fragment_index > 0:
-                merge_csvs(dihedrals)
+                dihedral_df = merge_csvs(dihedrals)
 
         # Measure hydrogen bond geometries
-        h_bond_geometries = f"{analysis_prefix}-hydrogen-bond-geometries.dat"
-
-        if not exists_and_not_empty(h_bond_geometries):
-            print(
-                "Measuring hydrogen bond geometries for system " f"{self.system_name}"
+        if not self._exists_and_not_empty(h_bond_geometries):
+            logger.info(
+                "Measuring hydrogen bond geometries for system %s", self.system_name
             )
 
             fragment_index = measure_h_bond_geometries(
@@ -554,12 +874,13 @@ class ProteinBenchmarkSystem:
         # Dihedral cluster assignments
         dihedral_clusters = f"{analysis_prefix}-dihedral-clusters.dat"
 
-        if not exists_and_not_empty(dihedral_clusters):
-            print(f"Assigning dihedral clusters for system {self.system_name}")
+        if not self._exists_and_not_empty(dihedral_clusters):
+            logger.info("Assigning dihedral clusters for system %s", self.system_name)
 
             assign_dihedral_clusters(
                 dihedrals_path=dihedrals,
                 output_path=dihedral_clusters,
+                dihedral_df=dihedral_df,
             )
 
         # Compute observables
@@ -568,10 +889,10 @@ class ProteinBenchmarkSystem:
         # Scalar couplings
         scalar_couplings = f"{analysis_prefix}-scalar-couplings.dat"
 
-        if "scalar_couplings" in target_observables and not exists_and_not_empty(
+        if "scalar_couplings" in target_observables and not self._exists_and_not_empty(
             scalar_couplings
         ):
-            print(f"Computing scalar couplings for system {self.system_name}")
+            logger.info("Computing scalar couplings for system %s", self.system_name)
 
             data = target_observables["scalar_couplings"]["observable_path"]
 
@@ -586,11 +907,11 @@ class ProteinBenchmarkSystem:
 
         if (
             "h_bond_scalar_couplings" in target_observables
-            and not exists_and_not_empty(h_bond_scalar_couplings)
+            and not self._exists_and_not_empty(h_bond_scalar_couplings)
         ):
-            print(
-                "Computing hydrogen bond scalar couplings for system "
-                f"{self.system_name}"
+            logger.info(
+                "Computing hydrogen bond scalar couplings for system %s",
+                self.system_name,
             )
 
             data = target_observables["h_bond_scalar_couplings"]["observable_path"]
@@ -604,10 +925,10 @@ class ProteinBenchmarkSystem:
         # Fraction helix
         fraction_helix = f"{analysis_prefix}-fraction-helix.dat"
 
-        if "fraction_helix" in target_observables and not exists_and_not_empty(
+        if "fraction_helix" in target_observables and not self._exists_and_not_empty(
             fraction_helix
         ):
-            print(f"Computing fraction helix for system {self.system_name}")
+            logger.info("Computing fraction helix for system %s", self.system_name)
 
             data = target_observables["fraction_helix"]["observable_path"]
 
@@ -6,6 +6,10 @@ SOLVENT_PADDING = 1.2 * unit.nanometer
 NONBONDED_CUTOFF = 0.9 * unit.nanometer
 VDW_SWITCH_WIDTH = 0.1 * unit.nanometer
 
+# Mass of solute hydrogen atoms for hydrogen mass repartitioning, which allows a
+# 4 fs timestep with constrained bonds to hydrogen
+HYDROGEN_MASS = 3.0 * unit.dalton
+
 # Use larger solvent padding for peptides and disordered proteins
 DISORDERED_SOLVENT_PADDING = 1.4 * unit.nanometer
 
@@ -16,7 +20,7 @@ ENERGY_TOLERANCE = 100 * unit.kilojoules_per_mole / unit.nanometer
 # Default equilibration simulation parameters
 EQUIL_LANGEVIN_FRICTION = 5.0 / unit.picosecond
 EQUIL_BAROSTAT_FREQUENCY = 5
-EQUIL_TIMESTEP = 1.0 * unit.femtosecond
+EQUIL_TIMESTEP = 4.0 * unit.femtosecond
 EQUIL_TRAJ_LENGTH = 1.0 * unit.nanosecond
 EQUIL_FRAME_LENGTH = 10.0 * unit.picosecond
 EQUIL_BAROSTAT_CONSTANT = 10.0 * unit.picosecond
@@ -28,10 +32,17 @@ BAROSTAT_FREQUENCY = 25
 TIMESTEP = 4.0 * unit.femtosecond
 FRAME_LENGTH = 100.0 * unit.picosecond
 CHECKPOINT_LENGTH = FRAME_LENGTH * 100
-SAVE_STATE_LENGTH = CHECKPOINT_LENGTH * 10
 BAROSTAT_CONSTANT = 10.0 * unit.picosecond
 THERMOSTAT_CONSTANT = 2.0 * unit.picosecond
 
+# Format of trajectories written by OpenMM simulations, "dcd" or "xtc". Writing
+# XTC files requires OpenMM 8.2 or mdtraj 1.10.
+TRAJECTORY_FORMAT = "dcd"
+
+# Minimum number of atoms for which a single trajectory is split across
+# multiple GPUs. Smaller systems do not amortize communication between devices.
+MULTI_GPU_MIN_ATOMS = 50000
+
 # Production trajectory length for peptides, folded proteins, and disordered
 # proteins
 PEPTIDE_TRAJ_LENGTH = 500.0 * unit.nanosecond
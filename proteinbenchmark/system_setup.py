@@ -8,6 +8,8 @@ from openff.toolkit import Topology as OFFTopology
 from openmm import app, unit
 
 from proteinbenchmark.force_fields import water_model_files
+from proteinbenchmark.openmm_simulation import get_openmm_platform
+from proteinbenchmark.simulation_parameters import HYDROGEN_MASS
 from proteinbenchmark.utilities import (read_xml, remove_model_lines,
                                         write_pdb, write_xml)
 
@@ -321,11 +323,12 @@ def solvate(
     water_model: str,
     force_field_file: str,
     water_model_file: str = None,
-    hydrogen_mass: unit.Quantity = 3.0 * unit.dalton,
+    hydrogen_mass: unit.Quantity = HYDROGEN_MASS,
     solvent_padding: unit.Quantity = None,
     n_solvent: int = None,
     setup_prefix: str = None,
     sim_platform: str = 'open_mm',
+    force_field: app.ForceField = None,
 ):
     """
     Add water and salt ions and write OpenMM System to XML. Exactly one of
@@ -361,6 +364,10 @@ def solvate(
         The number of solvent molecules used to setup the solvent box.
     sim_platform
         Simulation platform for file exporting
+    force_field
+        An OpenMM ForceField already read from force_field_file and
+        water_model_file. If provided, the files are not read again. Ignored
+        for SMIRNOFF force fields, which are read together with the solute.
     """
 
     # Check arguments
@@ -453,7 +460,11 @@ def solvate(
         solute_positions = solute_interchange.positions.to_openmm()
 
     else:
-        if water_model_file is None:
+        if force_field is not None:
+            # OpenMM force field that was already read by the caller
+            print(f"Force field reused from\n    {force_field_file}")
+
+        elif water_model_file is None:
             # OpenMM force field with no separate water model
             force_field = app.ForceField(force_field_file)
             print(f"Force field read from\n    {force_field_file}")
@@ -716,7 +727,7 @@ def solvate(
             
             struct = pmd.openmm.load_topology(modeller.topology, openmm_sys, xyz=modeller.positions)
             
-            hmass = pmd.tools.HMassRepartition(struct, 3)
+            hmass = pmd.tools.HMassRepartition(struct, hydrogen_mass.value_in_unit(unit.dalton))
             hmass.execute()
 
             struct.save(str(setup_prefix)+ '.gro')
@@ -759,6 +770,7 @@ def minimize(
     setup_prefix: str,
     sim_platform: str,
     gmx_executable: str=None,
+    openmm_platform: str = None,
 ):
     """
     Minimize energy of solvated system with Cartesian restraints on non-hydrogen
@@ -776,6 +788,9 @@ def minimize(
         The path to write the minimized PDB.
     sim_platform
         Simulation platform to use for energy minimization
+    openmm_platform
+        The name of the OpenMM Platform. Default is the fastest available GPU
+        platform. "CPU" and "Reference" are only used if named explicitly.
     """
 
     #If running in OpenMM 
@@ -826,11 +841,17 @@ def minimize(
 
         # Set up minimization and print initial energy
         integrator = openmm.VerletIntegrator(1.0 * unit.femtosecond)
+        platform, platform_properties = get_openmm_platform(openmm_platform)
+        print(
+            f"Using OpenMM platform {platform.getName()} with properties "
+            f"{platform_properties}"
+        )
         simulation = app.Simulation(
             solvated_pdb.topology,
             openmm_system,
             integrator,
-            openmm.Platform.getPlatformByName("CUDA"),
+            platform,
+            platform_properties,
         )
         simulation.context.setPositions(solvated_pdb.positions)
         initial_state = simulation.context.getState(getEnergy=True)
@@ -0,0 +1,132 @@
+"""
+Regression tests for dihedral cluster assignment.
+"""
+
+import numpy
+import pandas
+import pytest
+
+from proteinbenchmark.analysis import assign_dihedral_clusters
+from proteinbenchmark.analysis_parameters import HOLLINGSWORTH_RAMACHANDRAN_CLUSTERS
+
+# (resname, {dihedral name: value}, expected rotamer)
+ROTAMER_CASES = [
+    ("PHE", {"chi1": -67, "chi2": -81}, "m-80"),
+    # chi2 of PHE, TYR, ASP, and GLU is symmetric under a 180 deg rotation
+    ("PHE", {"chi1": -67, "chi2": 99}, "m-80"),
+    ("PHE", {"chi1": 64, "chi2": 88}, "p90"),
+    ("PHE", {"chi1": -178, "chi2": -104}, "t80"),
+    ("PHE", {"chi1": 0, "chi2": 0}, "Outlier"),
+    ("TYR", {"chi1": -178, "chi2": 76}, "t80"),
+    ("ASP", {"chi1": -69, "chi2": 151}, "m-30"),
+    ("ASP", {"chi1": -172, "chi2": -2}, "t0"),
+    ("VAL", {"chi1": 176}, "t"),
+    ("VAL", {"chi1": -62}, "m"),
+    ("VAL", {"chi1": 120}, "Outlier"),
+    ("ALA", dict(), None),
+]
+
+
+def _dihedral_rows(frame, resid, resname, dihedrals):
+    return [
+        {
+            "Frame": frame,
+            "Time (ns)": frame * 0.1,
+            "Resid": resid,
+            "Resname": resname,
+            "Dihedral Name": dihedral_name,
+            "Dihedral (deg)": dihedral,
+        }
+        for dihedral_name, dihedral in dihedrals.items()
+    ]
+
+
+def _reference_ramachandran_clusters(dihedral_df):
+    """Ramachandran cluster assignment as implemented with DataFrame.loc."""
+
+    dihedral_df = (
+        dihedral_df.pivot(
+            index=["Frame", "Time (ns)", "Resid", "Resname"],
+            columns="Dihedral Name",
+            values="Dihedral (deg)",
+        )
+        .add_suffix(" (deg)")
+        .reset_index()
+        .rename_axis(columns=None)
+    )
+
+    phi = dihedral_df["phi (deg)"] % 360
+    psi = (dihedral_df["psi (deg)"] + 120) % 360 - 120
+
+    dihedral_df["Ramachandran Cluster"] = None
+    dihedral_df.loc[~((phi.isna()) | (psi.isna())), "Ramachandran Cluster"] = "Outlier"
+
+    for cluster in HOLLINGSWORTH_RAMACHANDRAN_CLUSTERS:
+        dihedral_df.loc[
+            (phi > cluster["phi"][0])
+            & (phi < cluster["phi"][1])
+            & (psi > cluster["psi"][0])
+            & (psi < cluster["psi"][1]),
+            "Ramachandran Cluster",
+        ] = cluster["cluster"]
+
+    return dihedral_df.set_index(["Frame", "Resid"])["Ramachandran Cluster"]
+
+
+@pytest.fixture
+def dihedral_df():
+    rng = numpy.random.default_rng(0)
+    rows = list()
+
+    # Random backbone dihedrals, with undefined phi for the first residue and
+    # undefined psi for the last residue
+    for frame in range(500):
+        phi, psi = rng.uniform(-180, 180, size=(2, 3))
+        rows.extend(_dihedral_rows(frame, 1, "ALA", {"psi": psi[0]}))
+        rows.extend(_dihedral_rows(frame, 2, "GLY", {"phi": phi[1], "psi": psi[1]}))
+        rows.extend(_dihedral_rows(frame, 3, "ALA", {"phi": phi[2]}))
+
+    # Sidechain dihedrals for rotamer assignment, one residue per frame
+    for case_index, (resname, dihedrals, rotamer) in enumerate(ROTAMER_CASES):
+        rows.extend(
+            _dihedral_rows(
+                case_index, 4, resname, {"phi": -60, "psi": -45, **dihedrals}
+            )
+        )
+
+    return pandas.DataFrame(rows)
+
+
+@pytest.fixture
+def dihedral_clusters(dihedral_df, tmp_path):
+    output_path = tmp_path / "dihedral-clusters.dat"
+
+    assign_dihedral_clusters(
+        dihedrals_path=None,
+        output_path=output_path,
+        dihedral_df=dihedral_df,
+    )
+
+    return pandas.read_csv(output_path, index_col=0).set_index(["Frame", "Resid"])
+
+
+def test_ramachandran_clusters_match_reference(dihedral_df, dihedral_clusters):
+    reference = _reference_ramachandran_clusters(dihedral_df)
+    assigned = dihedral_clusters["Ramachandran Cluster"].reindex(reference.index)
+
+    pandas.testing.assert_series_equal(
+        assigned.fillna("None"),
+        reference.fillna("None"),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("case_index", range(len(ROTAMER_CASES)))
+def test_sidechain_rotamers(dihedral_clusters, case_index):
+    resname, dihedrals, expected_rotamer = ROTAMER_CASES[case_index]
+    rotamer = dihedral_clusters.loc[(case_index, 4), "Sidechain Rotamer"]
+
+    if expected_rotamer is None:
+        assert pandas.isna(rotamer)
+    else:
+        assert rotamer == expected_rotamer
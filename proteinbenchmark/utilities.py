@@ -11,19 +11,31 @@ package_data_directory = Path(Path(__file__).parent.absolute(), "data")
 def exists_and_not_empty(file_name):
     """Returns True if file_name exists and is not empty."""
 
-    path = Path(file_name)
-    return path.exists() and path.stat().st_size > 0
+    try:
+        return Path(file_name).stat().st_size > 0
+    except FileNotFoundError:
+        return False
 
 
-def list_of_dicts_to_csv(list_of_dicts, csv_path):
-    """Convert a list of dicts to a pandas DataFrame and then write to csv."""
+def list_of_dicts_to_csv(list_of_dicts, csv_path, decimals=None):
+    """
+    Convert a list of dicts to a pandas DataFrame and then write to csv. Returns
+    the DataFrame. If decimals is provided, columns are rounded first, as in
+    pandas.DataFrame.round(decimals).
+    """
 
     df = pandas.DataFrame(list_of_dicts)
+
+    if decimals is not None:
+        df = df.round(decimals)
+
     df.to_csv(csv_path)
 
+    return df
+
 
 def merge_csvs(csv_prefix):
-    """Merge multiple CSV files into one CSV."""
+    """Merge multiple CSV files into one CSV. Returns the merged DataFrame."""
 
     parent_dir = Path(csv_prefix).parent
     glob_prefix = Path(csv_prefix).name
@@ -34,12 +46,14 @@ def merge_csvs(csv_prefix):
     for csv_file in parent_dir.glob(f"{glob_prefix}-*"):
         file_indices.append(int(csv_file.suffix.split("-")[-1]))
 
-    # Write merged CSV
-    df = pandas.DataFrame()
-
-    for i in sorted(file_indices):
-        csv_file = Path(f"{csv_prefix}-{i}")
-        df = pandas.concat([df, pandas.read_csv(csv_file, index_col=0)])
+    # Write merged CSV, concatenating all fragments at once rather than
+    # copying the growing DataFrame for each fragment
+    df = pandas.concat(
+        [
+            pandas.read_csv(f"{csv_prefix}-{i}", index_col=0)
+            for i in sorted(file_indices)
+        ]
+    )
 
     df.to_csv(Path(csv_prefix))
 
@@ -47,6 +61,8 @@ def merge_csvs(csv_prefix):
     for i in sorted(file_indices):
         Path(f"{csv_prefix}-{i}").unlink()
 
+    return df
+
 
 def read_xml(xml_file_name):
     """Read an OpenMM system from an XML file."""